@@ -20,11 +20,15 @@ Supported Type Modifiers
 - No modifier: Plain string
 - i: Convert to integer
 - f: Convert to float
+- h: Convert to float from hexadecimal notation (`float.hex()`)
 - r: Evaluate as Python literal (for True, False, None, etc.)
+- j: Decode as JSON
+- e: Decode backslash escapes (`\\n`, `\\t`, `\\xNN`, `\\\\`, ...)
 - s: Convert to string (with UTF-8 encoding)
 - b: Convert to bytes (with UTF-8 encoding)
 - 32: Base32 decode
 - 64: Base64 decode
+- 85: Base85 decode
 - p: Unpickle (deserialize Python object)
 
 Modifiers can be combined and are applied left-to-right. For example:
@@ -34,11 +38,13 @@ Modifiers can be combined and are applied left-to-right. For example:
 Automatic Encoding
 ------------------
 When writing values, the module automatically selects appropriate encoding:
-- Strings with control characters → base64 encoded (/64s)
+- Strings with control characters → backslash escaped (/e)
 - Bytes → base32 encoded (/32)
 - Booleans and None → repr format (/r)
 - Integers → int format (/i)
 - Floats → float format (/f)
+- Lists and string-keyed dicts of strings, numbers, booleans and None → JSON (/j)
+- Other tuples, lists, sets and dicts of literals → repr format (/r)
 - Complex objects → pickled and base64 encoded (/64p)
 
 Example Usage
@@ -74,32 +80,190 @@ Functions
 
 """
 
-__all__ = ('write_config', 'read_config')
+__all__ = ('write_config', 'read_config', 'Structure')
 
 import os
+import stat
 import pickle
 import base64
+import binascii
 import copy
+import collections
+import collections.abc
+import weakref
 import logging
 import ast
-from pathlib import Path
+import json
+import re
+import locale
+import tempfile
+
+try:
+    import pybase64
+except ImportError:
+    pybase64 = None
 
 logger = logging.getLogger('plain-config')
 
 default_chmod = 0o600
 
-_eval_safe_item = (str, bytes, int, float, bool)
+# base64 codec: use the SIMD accelerated `pybase64` when available
+if pybase64 is not None:
+    _b64encode = pybase64.b64encode
+    def _b64decode(s):
+        return pybase64.b64decode(s, validate=False)
+else:
+    # call the C codec directly, skipping the per-call argument
+    # handling of `base64.b64encode` / `base64.b64decode`
+    def _b64encode(s):
+        return binascii.b2a_base64(s, newline=False)
+    _b64decode = binascii.a2b_base64
+
+# base32 codec: the stdlib one loops in Python over each 5 byte group;
+# here the input is split in "lanes" (every 5th byte, or every 8th char),
+# each lane is transformed with `bytes.translate`, lanes sharing an output
+# are merged with a big integer OR, and the results are interleaved by
+# slice assignment, so that the work per byte is done in C
+_B32_ALPHABET = b'ABCDEFGHIJKLMNOPQRSTUVWXYZ234567'
+_B32_REV = {c: i for i, c in enumerate(_B32_ALPHABET)}
+# shorter payloads are left to the stdlib, that has less overhead
+_B32_VECTOR_MIN = 64
+
+def _b32_table(f, rev=False):
+    if rev:
+        return bytes(f(_B32_REV.get(c, 0)) & 0xFF for c in range(256))
+    return bytes(f(c) & 0xFF for c in range(256))
+
+_B32_ALPHABET_TABLE = _b32_table(lambda x: _B32_ALPHABET[x & 31])
+# for each output character, the (input lane, table) pairs that compose it
+_B32_ENC_TERMS = [
+    [(0, _b32_table(lambda x: x >> 3))],
+    [(0, _b32_table(lambda x: (x & 7) << 2)), (1, _b32_table(lambda x: x >> 6))],
+    [(1, _b32_table(lambda x: (x >> 1) & 31))],
+    [(1, _b32_table(lambda x: (x & 1) << 4)), (2, _b32_table(lambda x: x >> 4))],
+    [(2, _b32_table(lambda x: (x & 15) << 1)), (3, _b32_table(lambda x: x >> 7))],
+    [(3, _b32_table(lambda x: (x >> 2) & 31))],
+    [(3, _b32_table(lambda x: (x & 3) << 3)), (4, _b32_table(lambda x: x >> 5))],
+    [(4, _b32_table(lambda x: x & 31))],
+]
+# for each output byte, the (input lane, table) pairs that compose it
+_B32_DEC_TERMS = [
+    [(0, _b32_table(lambda v: v << 3, True)), (1, _b32_table(lambda v: v >> 2, True))],
+    [(1, _b32_table(lambda v: (v & 3) << 6, True)), (2, _b32_table(lambda v: v << 1, True)),
+     (3, _b32_table(lambda v: v >> 4, True))],
+    [(3, _b32_table(lambda v: (v & 15) << 4, True)), (4, _b32_table(lambda v: v >> 1, True))],
+    [(4, _b32_table(lambda v: (v & 1) << 7, True)), (5, _b32_table(lambda v: v << 2, True)),
+     (6, _b32_table(lambda v: v >> 3, True))],
+    [(6, _b32_table(lambda v: (v & 7) << 5, True)), (7, _b32_table(lambda v: v, True))],
+]
+
+def _b32_transpose(data, n_in, terms):
+    """Apply `terms` to the `n_in` lanes of `data`, and interleave the results."""
+    g = len(data) // n_in
+    lanes = [data[i::n_in] for i in range(n_in)]
+    out = bytearray(g * len(terms))
+    for j, term in enumerate(terms):
+        if len(term) == 1:
+            i, t = term[0]
+            r = lanes[i].translate(t)
+        else:
+            acc = 0
+            for i, t in term:
+                acc |= int.from_bytes(lanes[i].translate(t), 'big')
+            r = acc.to_bytes(g, 'big')
+        out[j::len(terms)] = r
+    return out
+
+def _b32encode(s):
+    """Same as `base64.b32encode`."""
+    full = len(s) // 5 * 5
+    if full < _B32_VECTOR_MIN:
+        return base64.b32encode(s)
+    s = bytes(s)
+    out = _b32_transpose(s[:full], 5, _B32_ENC_TERMS).translate(_B32_ALPHABET_TABLE)
+    return bytes(out) + base64.b32encode(s[full:])
+
+def _b32decode(s):
+    """Same as `base64.b32decode`; base32 payloads are ASCII by definition."""
+    if isinstance(s, str):
+        s = s.encode('ascii')
+    head = s[:-8]
+    if len(head) < _B32_VECTOR_MIN or len(s) % 8 or head.translate(None, _B32_ALPHABET):
+        # short, or padding and errors that the stdlib reports
+        return base64.b32decode(s)
+    # only the last group may be padded
+    return bytes(_b32_transpose(head, 8, _B32_DEC_TERMS)) + base64.b32decode(s[-8:])
+
+_eval_safe_item = (str, bytes, int, float, bool, type(None))
 _eval_safe_recurse = (tuple, list, set)
+_eval_safe_containers = (dict,) + _eval_safe_recurse
+_eval_safe_leaf_types = frozenset(_eval_safe_item)
+_eval_safe_exit = object()
 
 def _check_eval_safe(S):
-    if S is None or  any (isinstance(S, t) for t in _eval_safe_item):
-        return True
-    if isinstance(S, dict):
-        return all( (_check_eval_safe(k) and  _check_eval_safe(v))
-                    for k, v in S.items())
-    if any (isinstance(S, t) for t in _eval_safe_recurse):
-        return all(  _check_eval_safe(v)    for v in S)
-    return False
+    """Return True if `repr(S)` can be decoded back by `ast.literal_eval`."""
+    # iterative walk; `active` holds the containers on the current path,
+    # each one is followed on the stack by its id and `_eval_safe_exit`
+    stack = [S]
+    active = set()
+    while stack:
+        x = stack.pop()
+        if x is _eval_safe_exit:
+            active.remove(stack.pop())
+            continue
+        if type(x) in _eval_safe_leaf_types:
+            continue
+        if isinstance(x, dict):
+            children = (x.keys(), x.values())
+        elif isinstance(x, _eval_safe_recurse):
+            children = (x,)
+        elif isinstance(x, _eval_safe_item):
+            continue
+        else:
+            return False
+        i = id(x)
+        if i in active:
+            # recursive container, its repr() contains '...'
+            return False
+        active.add(i)
+        stack.append(i)
+        stack.append(_eval_safe_exit)
+        for c in children:
+            stack.extend(c)
+    return True
+
+_json_exact_leaf_types = frozenset((str, int, float, bool, type(None)))
+
+def _check_json_exact(S):
+    """Return True if `json.loads(json.dumps(S))` rebuilds `S` with the same types."""
+    # same walk as `_check_eval_safe`, but only exact types are accepted:
+    # JSON has no tuples, sets or bytes, and dict keys must be strings
+    stack = [S]
+    active = set()
+    while stack:
+        x = stack.pop()
+        if x is _eval_safe_exit:
+            active.remove(stack.pop())
+            continue
+        t = type(x)
+        if t in _json_exact_leaf_types:
+            continue
+        if t is dict:
+            if not all(type(k) is str for k in x):
+                return False
+            children = x.values()
+        elif t is list:
+            children = x
+        else:
+            return False
+        i = id(x)
+        if i in active:
+            return False
+        active.add(i)
+        stack.append(i)
+        stack.append(_eval_safe_exit)
+        stack.extend(children)
+    return True
 
 
 
@@ -110,81 +274,289 @@ def mychmod(f, mode=default_chmod):
     except Exception as E:
         logger.exception('Why cant I set chmod %r on %r', mode, f)
 
-def _is_ctrl(c):
-    """Return True if character c is a control character."""
-    if not c:
-        return False
-    if isinstance(c, str):
-        code = ord(c)
-    else:
-        code = c
-    assert  isinstance(code, int)
-    # C0 controls (0-31) and DEL (127) and C1 controls (128-159)
-    return (0x00 <= code <= 0x1F) or (0x7F <= code <= 0x9F)
-
-def _is_ctrl_but_rnc(c):
-    """Return True if character c is a control character, but not \r \t \n."""
-    if not c:
-        return False
-    if isinstance(c, str):
-        code = ord(c)
-    else:
-        code = c
-    assert  isinstance(code, int)
-    return ( (0x00 <= code <= 0x1F) and (code not in (9, 13, 10))) or (0x7F <= code <= 0x9F)
+def _write_all(fd, data):
+    """Write all of `data` to the file descriptor `fd`, that may accept it in parts."""
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+def _fix_chmod(fd, f, mode=default_chmod):
+    """Set permissions of the file descriptor `fd` (of file `f`), only if they differ."""
+    try:
+        if stat.S_IMODE(os.fstat(fd).st_mode) == mode:
+            return
+        if hasattr(os, 'fchmod'):
+            os.fchmod(fd, mode)
+            return
+    except Exception as E:
+        logger.exception('Why cant I set chmod %r on %r', mode, f)
+        return
+    mychmod(f, mode)
+
+# C0 controls (0-31) and DEL (127) and C1 controls (128-159)
+_CTRL_ALL = bytes(range(0x00, 0x20)) + bytes(range(0x7F, 0xA0))
+# deletion table to detect control characters in one `str.translate` pass,
+# which is fastest on long ASCII text (it has a setup cost per distinct
+# character); the regex stops at the first match and is faster on other strings
+_HAS_CTRL_TABLE = str.maketrans('', '', _CTRL_ALL.decode('latin-1'))
+_CTRL_SEARCH = re.compile('[\x00-\x1f\x7f-\x9f]').search
+_HAS_CTRL_TRANSLATE_MIN = 512
+# Python >= 3.7
+_str_isascii = getattr(str, 'isascii', None)
+# escapes backslashes and control characters for the `/e` modifier
+_ESCAPE_TABLE = {c: '\\x%02x' % c for c in _CTRL_ALL}
+_ESCAPE_TABLE.update({ord('\\'): '\\\\', ord('\n'): '\\n', ord('\t'): '\\t', ord('\r'): '\\r'})
+
+# encoders used by `write_config`, each returns `(modifier, encoded_value)`
+
+def _has_ctrl(v):
+    """Return True if string v contains a control character."""
+    if len(v) > _HAS_CTRL_TRANSLATE_MIN and _str_isascii is not None and _str_isascii(v):
+        return len(v.translate(_HAS_CTRL_TABLE)) != len(v)
+    return _CTRL_SEARCH(v) is not None
+
+def _enc_str(v):
+    if type(v) is not str:
+        # subclasses (as `enum` members) may format differently than their data
+        v = str.__str__(v)
+    if _has_ctrl(v):
+        # escape them, keeping the rest of the text readable
+        return 'e', v.translate(_ESCAPE_TABLE)
+    return '', v
+
+def _enc_repr(v):
+    # will use ast.literal_eval for decoding
+    return 'r', repr(v)
+
+# characters that `json.dumps(..., ensure_ascii=False)` leaves unescaped, but
+# should not be written
+_JSON_UNSAFE = re.compile('[\x7f-\x9f\ud800-\udfff]').search
+
+def _enc_json(v):
+    # decoded by the fast C parser of the `json` module
+    s = json.dumps(v, ensure_ascii=False)
+    if _JSON_UNSAFE(s):
+        # JSON does not escape DEL, the C1 controls and lone surrogates,
+        # that cannot be encoded; `repr` escapes them
+        return _enc_repr(v)
+    return 'j', s
+
+def _enc_int(v):
+    return 'i', str(v)
+
+def _enc_float(v):
+    return 'f', repr(v)
+
+def _enc_float_hex(v):
+    # exact and cheaper than repr(), but not meant for humans
+    return 'h', v.hex()
+
+def _enc_bytes(v):
+    return '32', _b32encode(v).decode('ascii')
+
+# protocol 4 (Python 3.4+) uses framing and compact opcodes; it is the
+# default only since Python 3.8, and protocol 5 adds nothing for in-band data
+_PICKLE_PROTOCOL = 4
+
+def _enc_pickle(v):
+    return '64p', _b64encode(pickle.dumps(v, _PICKLE_PROTOCOL)).decode('ascii')
+
+# fast dispatch on the exact type; subclasses go through `isinstance` checks
+_ENCODERS = {
+    str: _enc_str,
+    bool: _enc_repr,
+    type(None): _enc_repr,
+    int: _enc_int,
+    float: _enc_float,
+    bytes: _enc_bytes,
+}
+_ENCODERS_FLOAT_HEX = dict(_ENCODERS)
+_ENCODERS_FLOAT_HEX[float] = _enc_float_hex
+
+# subclasses of these types are written as the base type
+_ENCODER_BASES = (str, int, float, bytes)
+# class -> its base in `_ENCODER_BASES` (or None), resolved once per class
+_encoder_base_cache = weakref.WeakKeyDictionary()
+
+def _encoder_base(t):
+    try:
+        return _encoder_base_cache[t]
+    except KeyError:
+        pass
+    base = next((b for b in t.__mro__ if b in _ENCODER_BASES), None)
+    _encoder_base_cache[t] = base
+    return base
 
 funny_continuation_chars = r'\|⤸;↓↘→⟶⇒⇨⇩▼▽◢◣⤵║│┃┆┇┊┋∣⎟⎢⎥'
 
-def _write_split(F, m, k, v, split_long_lines, continuation_chars):
-    """Render a single line, adding `/C<char>` when `value` would exceed `split_long_lines`."""
+def _write_split(out, m, k, v, split_long_lines, continuation_chars):
+    """Render a single line into the list `out`, adding `/C<char>` when `value` would exceed `split_long_lines`."""
     if not split_long_lines or \
        (len(v) + len(k) + len(m) + 2) < split_long_lines:
-        if m:
-            m = '/' + m
-        F.write(k + m + '='+ v + '\n')
+        out.append(f'{k}/{m}={v}\n' if m else f'{k}={v}\n')
         return
-    cont = None
-    for c in  continuation_chars:
-        if c not in v:
-            cont = c
-            break
+    # one pass over `v`, instead of one scan per candidate
+    v_chars = set(v)
+    cont = next((c for c in continuation_chars if c not in v_chars), None)
     if cont is None:
         logger.error('cannot split %r', v)
-        if m:
-            m = '/' + m
-        F.write(k + m + '='+ v + '\n')
+        out.append(f'{k}/{m}={v}\n' if m else f'{k}={v}\n')
         return
-    m = '/C' + cont + m
+    m = f'/C{cont}{m}'
     pre = (len(k) + len(m) + 2)
-    F.write(k + m + '=')
-    while (pre + len(v)) > split_long_lines:
+    append = out.append
+    append(f'{k}{m}=')
+    # `o` is the offset of the unwritten part of `v`, so that
+    # the value is not copied again at each chunk
+    n = len(v)
+    o = 0
+    while (pre + n - o) > split_long_lines:
         l = max(split_long_lines - pre, 2)
         # find a nicer place where to split...
         s = l
         e = l * 3 // 4
         if s > e and e > 2:
-            for j in range(s, e, -1):
+            for j in range(o + s, o + e, -1):
                 if v[j] in  ' ])},;-+\n\t':
-                    l = j
+                    l = j - o
                     break
-        F.write(v[:l]+cont+'\n')
-        v = v[l:]
+        append(f'{v[o:o+l]}{cont}\n')
+        o += l
         pre = 0
-    F.write(v + '\n')
+    append(f'{v[o:]}\n')
+
 
+class Structure(collections.abc.MutableSequence):
+    """
+    Layout of a configuration file, as returned by `read_config`.
+
+    It behaves as a mutable sequence of `(key, modifier, raw_line)` triples, where
+    comments and blank lines are `(None, None, raw_line)` and unparsable
+    lines are `(False, False, raw_line)`; the data is stored as parallel
+    arrays (a one byte kind tag, the key or `None`/`False`, and the raw line)
+    instead of one tuple per line.
+    """
+    __slots__ = ('kinds', 'keys', 'raw')
+
+    KEY = ord('K')
+    COMMENT = ord('C')
+    INVALID = ord('X')
+
+    def __init__(self, items=()):
+        self.kinds = bytearray()
+        self.keys = []
+        self.raw = []
+        for item in items:
+            self.append(item)
+
+    def _add(self, kind, key, raw):
+        self.kinds.append(kind)
+        self.keys.append(key)
+        self.raw.append(raw)
+
+    def _parts(self, item):
+        key, _, raw = item
+        if key is None:
+            return self.COMMENT, None, raw
+        if key is False:
+            return self.INVALID, False, raw
+        return self.KEY, key, raw
+
+    def append(self, item):
+        """Append a `(key, modifier, raw_line)` triple."""
+        self._add(*self._parts(item))
+
+    def insert(self, i, item):
+        """Insert a `(key, modifier, raw_line)` triple before index `i`."""
+        kind, key, raw = self._parts(item)
+        self.kinds.insert(i, kind)
+        self.keys.insert(i, key)
+        self.raw.insert(i, raw)
+
+    def _item(self, kind, key, raw):
+        if kind == self.KEY:
+            return (key, '', raw)
+        if kind == self.COMMENT:
+            return (None, None, raw)
+        return (False, False, raw)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._item(*t) for t in zip(self.kinds[i], self.keys[i], self.raw[i])]
+        return self._item(self.kinds[i], self.keys[i], self.raw[i])
+
+    def __setitem__(self, i, item):
+        if isinstance(i, slice):
+            parts = [self._parts(t) for t in item]
+            self.kinds[i] = bytearray(p[0] for p in parts)
+            self.keys[i] = [p[1] for p in parts]
+            self.raw[i] = [p[2] for p in parts]
+        else:
+            kind, key, raw = self._parts(item)
+            # checks the index before changing anything
+            self.kinds[i] = kind
+            self.keys[i] = key
+            self.raw[i] = raw
+
+    def __delitem__(self, i):
+        del self.kinds[i]
+        del self.keys[i]
+        del self.raw[i]
+
+    def __iter__(self):
+        for t in zip(self.kinds, self.keys, self.raw):
+            yield self._item(*t)
+
+    def __add__(self, other):
+        new = self.copy()
+        new.extend(other)
+        return new
+
+    def __radd__(self, other):
+        new = Structure(other)
+        new.extend(self)
+        return new
+
+    def __eq__(self, other):
+        if isinstance(other, Structure):
+            return (self.kinds, self.keys, self.raw) == (other.kinds, other.keys, other.raw)
+        if isinstance(other, (list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self):
+        return 'Structure(%r)' % (list(self),)
+
+    def copy(self):
+        """Return a copy, that can be modified independently."""
+        new = Structure()
+        new.kinds = bytearray(self.kinds)
+        new.keys = list(self.keys)
+        new.raw = list(self.raw)
+        return new
+
+
+# a key cannot contain the separators, nor control characters that would break the line
+_KEY_OK = re.compile(r'[^=/\x00-\x1f]*\Z').match
 
 def write_config(infofile, db, sdb=[], safe=True, rewrite_old = False,
-                 split_long_lines=72, continuation_chars=None):
+                 split_long_lines=72, continuation_chars=None, float_hex=False):
     """
     Write configuration data while preserving structure and inserting type modifiers.
 
     Parameters
     ----------
-    infofile : str | bytes | Path | IO
-        Destination path or open text stream; paths are created with mode 0o600.
+    infofile : str | bytes | os.PathLike | IO
+        Destination path or open text stream; paths are replaced atomically by a new file with mode 0o600,
+        existing pipes and devices are written into.
     db : dict
         Mapping of keys (without '=' or '/') to Python values.
-    sdb : list[tuple], optional
+    sdb : Structure | list[tuple], optional
         Structure metadata from `read_config`; keeps ordering, comments, and blank lines.
     safe : bool
         Allow pickled `/p` and `/64p` payloads when False.
@@ -194,79 +566,138 @@ def write_config(infofile, db, sdb=[], safe=True, rewrite_old = False,
         Maximum output width before `/C<char>` continuations are generated; falsy disables wrapping.
     continuation_chars : str | None
         Ordered list of glyphs to try for `/C<char>` markers; defaults to `funny_continuation_chars`.
+    float_hex : bool
+        Write floats as `/h` with `float.hex()`, faster than `/f` but less readable.
 
     Notes
     -----
-    - Values are encoded automatically (/r, /i, /f, /32, /64s, /64p, etc.).
+    - Values are encoded automatically (/e, /r, /j, /i, /f, /32, /64p, etc.).
     - `_write_split` chooses the first continuation character absent from the payload;
       if none remain the value is written unsplit and an error is logged.
     - Existing keys from `sdb` are emitted first, followed by any new keys in `db`.
     """
-    if isinstance(infofile, (str, bytes, Path)): 
-        with open(infofile,'w') as F:
-            mychmod(infofile)
-            write_config(
-                F,
-                db,
-                sdb,
-                safe,
-                rewrite_old,
-                split_long_lines,
-                continuation_chars,
-            )
+    text = _write_config(db, sdb, safe, rewrite_old, split_long_lines,
+                         continuation_chars, float_hex)
+    if not isinstance(infofile, (str, bytes, os.PathLike)):
+        infofile.write(text)
         return
+    infofile = os.fspath(infofile)
+    # encode once, as a file opened in text mode would
+    if os.linesep != '\n':
+        text = text.replace('\n', os.linesep)
+    data = text.encode(locale.getpreferredencoding(False))
+    path = os.path.realpath(infofile)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        st = None
+    if st is not None and not stat.S_ISREG(st.st_mode):
+        # pipes and devices cannot be replaced, write into them;
+        # their mode is left alone
+        fd = os.open(path, os.O_WRONLY | os.O_TRUNC | getattr(os, 'O_BINARY', 0))
+        try:
+            _write_all(fd, data)
+        finally:
+            os.close(fd)
+        return
+    # write a temporary file next to the real one and rename it over it,
+    # so that readers never see a partial file, and symlinks are kept
+    dot, suffix = (b'.', b'.tmp') if isinstance(path, bytes) else ('.', '.tmp')
+    # a unique name, created with O_EXCL and mode 0o600
+    fd, tmp = tempfile.mkstemp(suffix=suffix, prefix=os.path.basename(path) + dot,
+                               dir=os.path.dirname(path))
+    try:
+        try:
+            # `default_chmod` may have been changed
+            _fix_chmod(fd, tmp)
+            _write_all(fd, data)
+        finally:
+            os.close(fd)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    finally:
+        _uncache(infofile)
+
+
+def _write_config(db, sdb, safe, rewrite_old, split_long_lines, continuation_chars, float_hex):
+    """Return the text of the configuration, see `write_config`."""
     if continuation_chars is None:
         continuation_chars = funny_continuation_chars
     assert isinstance(continuation_chars, str)
     #
-    F = infofile
+    # output is collected here and joined once
+    chunks = []
+    append = chunks.append
+    encoders = _ENCODERS_FLOAT_HEX if float_hex else _ENCODERS
     #
-    def write_k_v(k,v,F):
-        def write_split(F, m, k, v):
-            return _write_split(F, m, k, v, split_long_lines, continuation_chars)
-        assert isinstance(k,str) and '=' not in k and '/' not in k
-        if isinstance(v,str):
-            if any( _is_ctrl(j) for j in v ):
-                if any( _is_ctrl_but_rnc(j)  for j in v ):
-                    # trigger on control chars not representable as '\t\r\n'
-                    v = v.encode('utf8')
-                    v = base64.b64encode(v)
-                    v = v.decode()
-                    write_split(F, '64s', k, v)
-                else:
-                    write_split(F, 'r', k, repr(v))
-            else:
-                write_split(F,'', k,v)
-        elif isinstance(v, bool) or v is None:
-            write_split(F, 'r', k, repr(v))
-        elif isinstance(v,int):
-            write_split(F, 'i', k, str(v))
-        elif isinstance(v,float):
-            write_split(F, 'f', k, repr(v))
-        elif isinstance(v,bytes):
-            write_split(F, '32', k, base64.b32encode(v).decode('ascii'))
-        elif _check_eval_safe(v):
-            write_split(F, 'r', k, repr(v))
-            # will use ast.literal_eval for decoding
+    # encoded containers and other objects, by identity: the same object may be
+    # stored under many keys; the object is kept in the entry, since a mapping
+    # may build values on access, and their ids could then be reused
+    memo = {}
+    def encode(v):
+        enc = encoders.get(type(v))
+        if enc is not None:
+            return enc(v)
+        entry = memo.get(id(v))
+        if entry is not None and entry[0] is v:
+            return entry[1]
+        base = _encoder_base(type(v))
+        if base is not None:
+            enc = encoders[base]
+        elif type(v) in (dict, list) and _check_json_exact(v):
+            enc = _enc_json
+        elif isinstance(v, _eval_safe_containers) and _check_eval_safe(v):
+            enc = _enc_repr
         elif not safe:
-            write_split(F, '64p', k, base64.b64encode(pickle.dumps(v)).decode('ascii'))
+            enc = _enc_pickle
         else:
             raise RuntimeError('cannot write {!r}, `safe` is True'.format(v))
+        r = enc(v)
+        memo[id(v)] = (v, r)
+        return r
+    #
+    def write_k_v(k,v):
+        if not isinstance(k, str) or not _KEY_OK(k):
+            raise AssertionError('invalid key {!r}'.format(k))
+        if type(k) is not str:
+            k = str.__str__(k)
+        if type(v) is str and not _has_ctrl(v):
+            # the common case, written as is
+            m = ''
+        else:
+            m, v = encode(v)
+        if not split_long_lines or (len(v) + len(k) + len(m) + 2) < split_long_lines:
+            # fits in a line, as most values do
+            append(f'{k}/{m}={v}\n' if m else f'{k}={v}\n')
+        else:
+            _write_split(chunks, m, k, v, split_long_lines, continuation_chars)
     #
-    db = copy.copy(db)
+    written = set()
+    if isinstance(sdb, Structure):
+        # no need to build the triples
+        entries = zip(sdb.keys, sdb.raw)
+    else:
+        entries = ((k, l) for k, m, l in sdb)
     # write keys that were in file, in same position
-    for k,m,l in sdb:
-        if k and k in db:
-            write_k_v(k,db[k],F)
-            db.pop(k)
+    for k,l in entries:
+        if k and k in db and k not in written:
+            write_k_v(k,db[k])
+            written.add(k)
         elif k and rewrite_old:
-            F.write(l)
+            append(l)
         # invalid lines are not rewritten
         elif k is None:
-            F.write(l)
+            append(l)
     # write new keys
-    for k in db.keys():
-        write_k_v(k,db[k],F)
+    for k, v in db.items():
+        if k not in written:
+            write_k_v(k, v)
+    return ''.join(chunks)
 
 
 def read_config(infofile, safe=True):
@@ -275,135 +706,278 @@ def read_config(infofile, safe=True):
 
     Parameters
     ----------
-    infofile : str | bytes | Path | Iterable[str]
+    infofile : str | bytes | os.PathLike | Iterable[str]
         File path (opened automatically) or any iterable yielding text lines.
     safe : bool
         Allow `/p` and `/64p` unpickling when False; keep True for untrusted files.
 
     Returns
     -------
-    tuple(dict, list)
+    tuple(dict, Structure)
         `(db, sdb)` where `db` maps keys to decoded Python values and `sdb`
-        preserves layout as `(key, modifier, raw_line)` tuples (`None` for
-        comments/blank lines, `False` for unparsable entries).
+        preserves layout as a sequence of `(key, modifier, raw_line)` tuples
+        (`None` for comments/blank lines, `False` for unparsable entries).
 
     Notes
     -----
     - Modifiers are applied left-to-right (`/64p` → base64 decode then unpickle).
     - Parsing continues after malformed lines, logging warnings so callers can react.
+    - Files given by path are cached, keyed on their inode, modification time
+      and size, and returned as copies that can be freely modified;
+      `write_config` drops the entry of the file it writes,
+      `read_config.cache_clear()` empties the cache. Files whose parse
+      logged something are not cached, so that each read logs it again.
     """
-    if isinstance(infofile, (str,bytes, Path)):
-        with open(infofile) as F:
-            db = _read_config(F, safe)
-        return db
+    if isinstance(infofile, (str, bytes, os.PathLike)):
+        # converted once, `Path` objects would be converted by each call below
+        infofile = os.fspath(infofile)
+        st = os.stat(infofile)
+        if not stat.S_ISREG(st.st_mode):
+            # pipes and special files have no meaningful stamp
+            return _read_config(_read_lines(infofile), safe, infofile)
+        key = (_cache_path(infofile), safe)
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+        hit = _PARSE_CACHE.get(key)
+        if hit is not None and hit[0] == stamp:
+            try:
+                _PARSE_CACHE.move_to_end(key)
+            except KeyError:
+                # dropped meanwhile by another thread
+                pass
+            return _copy_parsed(*hit[1:])
+        db, sdb, logged = _parse_config(_read_lines(infofile), safe, infofile)
+        if logged:
+            # not cached, so that the diagnostics are logged by each read
+            return db, sdb
+        # only these values need to be deep copied
+        mutable = [k for k, v in db.items() if type(v) not in _ATOMIC_TYPES]
+        try:
+            entry = (stamp,) + _copy_parsed(db, sdb, mutable) + (mutable,)
+        except Exception as E:
+            logger.debug('Not caching %r : %r', infofile, E)
+            return db, sdb
+        _PARSE_CACHE.pop(key, None)
+        _PARSE_CACHE[key] = entry
+        while len(_PARSE_CACHE) > _PARSE_CACHE_SIZE:
+            try:
+                _PARSE_CACHE.popitem(last=False)
+            except KeyError:
+                break
+        return db, sdb
     return  _read_config(infofile, safe)
 
-def _read_config(infofile, safe):
+# parsed files, as `(realpath, safe) -> (stat stamp, db, sdb, keys of mutable values)`,
+# least recently used first
+_PARSE_CACHE = collections.OrderedDict()
+_PARSE_CACHE_SIZE = 128
+read_config.cache_clear = _PARSE_CACHE.clear
+
+# values of these types are shared between the cache and the callers
+_ATOMIC_TYPES = frozenset((str, bytes, int, float, complex, bool, type(None)))
+
+def _copy_parsed(db, sdb, mutable):
+    """Copy a parse result, deep copying only the values in `mutable`."""
+    new = dict(db)
+    for k in mutable:
+        new[k] = copy.deepcopy(db[k])
+    return new, sdb.copy()
+
+def _cache_path(path):
+    # the same file is found whether named by str, bytes or a symlink
+    return os.fsdecode(os.path.realpath(path))
+
+def _uncache(path):
+    """Drop the cached parse of `path`, as `write_config` just replaced it."""
+    real = _cache_path(path)
+    for safe in (True, False):
+        _PARSE_CACHE.pop((real, safe), None)
+
+# a line of text, including its terminator
+_LINE_RE = re.compile(r'[^\n]*\n|[^\n]+')
+
+def _split_lines(text):
+    """Split `text` as iterating on a text mode file would, with universal newlines."""
+    if text.startswith('\ufeff'):
+        # byte order mark
+        text = text[1:]
+    if '\r' in text:
+        text = text.replace('\r\n', '\n').replace('\r', '\n')
+    return _LINE_RE.findall(text)
+
+def _read_lines(path):
+    """Return the lines in the file `path`, read and decoded in one call."""
+    with open(path, 'rb') as F:
+        text = F.read().decode(locale.getpreferredencoding(False))
+    return _split_lines(text)
+
+def _to_bytes(x):
+    if isinstance(x, str):
+        return x.encode('utf8')
+    return x
+
+# a single token of a modifier chain; `C` is followed by the continuation char
+_MOD_RE = re.compile(r'C(.?)|32|64|85|[psbifhjer]', re.DOTALL)
+
+def _unescape(value):
+    """Decode a `/e` value: characters outside latin-1 become `\\u` escapes, then all escapes are decoded in C."""
+    return value.encode('latin-1', 'backslashreplace').decode('unicode_escape')
+
+_SENTINEL = object()
+_LITERAL_FAST = {'True': True, 'False': False, 'None': None}
+_INT_LITERAL_RE = re.compile(r'-?(?:0|[1-9][0-9]*)\Z')
+
+def _literal_eval(value):
+    """`ast.literal_eval`, skipping the Python parser for constants and plain integers."""
+    v = _LITERAL_FAST.get(value, _SENTINEL)
+    if v is not _SENTINEL:
+        return v
+    if _INT_LITERAL_RE.match(value):
+        return int(value)
+    return ast.literal_eval(value)
+
+# decoders for the modifiers that need no state from the parser;
+# unpickling is only available when `safe` is False
+_MOD_HANDLERS_SAFE = {
+    'i': int,
+    'f': float,
+    'h': float.fromhex,
+    'r': _literal_eval,
+    'j': json.loads,
+    'e': _unescape,
+    '32': _b32decode,
+    '64': _b64decode,
+    '85': base64.b85decode,
+}
+_MOD_HANDLERS_UNSAFE = dict(_MOD_HANDLERS_SAFE)
+_MOD_HANDLERS_UNSAFE['p'] = lambda v: pickle.loads(_to_bytes(v))
+
+def _parse_config(infofile, safe, name=None):
     """
     Core parser that produces `(db, sdb)` from an iterable of text lines.
 
     Parameters
     ----------
-    infofile : Iterable[str]
-        Already-open file or any line iterator.
+    infofile : IO | Iterable[str]
+        Already-open text stream, read in one call, or any line iterator.
     safe : bool
         Allow `/p` and `/64p` unpickling when False.
+    name : str | bytes | None
+        File name used in log messages; defaults to `infofile.name`.
 
     Returns
     -------
-    tuple(dict, list)
-        See `read_config` for the meaning of `db` and `sdb`.
+    tuple(dict, Structure, bool)
+        See `read_config` for the meaning of `db` and `sdb`; the last item
+        is True if anything was logged.
 
     Logs
     ----
     Emits warnings for malformed lines, unknown modifiers, or pickle attempts
     when `safe=True`.
     """
-    def B(x): # to byte
-        if isinstance(x, str):
-            return x.encode('utf8')
-        return x
+    # name used in log messages, computed once instead of repr()ing `infofile` per line
+    where = name if name is not None else getattr(infofile, 'name', None)
+    if where is None:
+        where = '<%s>' % type(infofile).__name__
+    handlers = _MOD_HANDLERS_SAFE if safe else _MOD_HANDLERS_UNSAFE
+    # number of pickled values refused because `safe` is True
+    refused = 0
+    logged = False
     db = {}
-    sdb = []
-    I = iter(infofile)
+    sdb = Structure()
+    if hasattr(infofile, 'read'):
+        # one read and a split in C, instead of a readline() per line
+        I = iter(_split_lines(infofile.read()))
+    else:
+        I = iter(infofile)
     for line_ in I:
         line = line_.rstrip('\n\r')
         # skip comments and empty lines
-        if not line.strip() or line.strip().startswith('#'):
-            sdb.append( (None, None, line_) )
+        stripped = line.strip()
+        if not stripped or stripped[0] == '#':
+            sdb._add(Structure.COMMENT, None, line_)
             continue
-        if '=' not in line:
-            logger.warning('In file %r ignored line %r', infofile, line)
-            sdb.append( (False, False, line_) )
+        key, sep, value = line.partition('=')
+        if not sep:
+            logged = True
+            logger.warning('In file %r ignored line %r', where, line)
+            sdb._add(Structure.INVALID, False, line_)
             continue
-        m = key = value = False
+        m = False
         try:
-            key,value = line.split('=',1)
-            m=''
-            if '/' in key:
-                key,m = key.split('/',1)
-            while m:
-                if m.startswith('C'):
-                    if len(m) < 2:
-                        logger.warning('In file %r ignored line %r', infofile, line)
-                        sdb.append( (False, False, line_) )
+            key, _, m = key.partition('/')
+            handler = handlers.get(m)
+            if handler is not None:
+                # a lone stateless modifier, the common case: no need to tokenize
+                value = handler(value)
+                m = ''
+            pos = 0
+            while pos < len(m):
+                t = _MOD_RE.match(m, pos)
+                if t is None:
+                    logged = True
+                    logger.error('In file %r error parsing line modifiers : %r', where, line)
+                    m = False
+                    break
+                pos = t.end()
+                tok = t.group()
+                handler = handlers.get(tok)
+                if handler is not None:
+                    value = handler(value)
+                elif tok[0] == 'C':
+                    cont = t.group(1)
+                    if not cont:
+                        logged = True
+                        logger.warning('In file %r ignored line %r', where, line)
+                        sdb._add(Structure.INVALID, False, line_)
                         m = False
                         break
-                    cont = m[1]
-                    m = m[2:]
                     while value.endswith(cont):
                         l = next(I)
                         line_ += l
                         l = l.rstrip('\r\n')
                         value = value[:-1] + l
-                elif m.startswith('p'):
-                    if safe:
-                        logger.error('In file %r cannot read %r, `safe` is True', infofile, line)
-                        m = False
-                        break
-                    value = pickle.loads(B(value))
-                    m = m[1:]
-                elif m.startswith('s'):
+                elif tok == 'p':
+                    # only reached when `safe` is True
+                    if not refused:
+                        logged = True
+                        logger.error('In file %r cannot read %r, `safe` is True', where, line)
+                    refused += 1
+                    m = False
+                    break
+                elif tok == 's':
                     if isinstance(value, bytes):
                         value = value.decode('utf8')
                     elif isinstance(value, int):
                         value = str(value)
                     else:
-                        logger.warning('In file %r cannot convert to string the value : %r', infofile, value)
-                    m = m[1:]
-                elif m.startswith('b'):
+                        logged = True
+                        logger.warning('In file %r cannot convert to string the value : %r', where, value)
+                elif tok == 'b':
                     if isinstance(value, str):
                         value = value.encode('utf8')
                     #elif isinstance(value, int):
                     #    value = value.to_bytes(....)
                     else:
-                        logger.warning('In file %r cannot convert to bytes the value : %r', infofile, value)
-                    m = m[1:]
-                elif m.startswith('i'):
-                    value = int(value)
-                    m = m[1:]
-                elif m.startswith('f'):
-                    value = float(value)
-                    m = m[1:]
-                elif m.startswith('r'):
-                    value = ast.literal_eval(value)
-                    m = m[1:]
-                elif m.startswith('32'):
-                    value = base64.b32decode(B(value))
-                    m = m[2:]
-                elif m.startswith('64'):
-                    value = base64.b64decode(B(value))
-                    m = m[2:]
-                else:
-                    logger.error('In file %r error parsing line modifiers : %r', infofile, line)
-                    m = False
-                    break
+                        logged = True
+                        logger.warning('In file %r cannot convert to bytes the value : %r', where, value)
+            else:
+                m = ''
         #
         except Exception as E:
-            logger.error('In file %r error parsing  %r : %r', infofile, line, E)
+            logged = True
+            logger.error('In file %r error parsing  %r : %r', where, line, E)
         if m == '' and key != False:
             db[key] = value
-            sdb.append( (key, m, line_) )
+            sdb._add(Structure.KEY, key, line_)
         else:
-            sdb.append( (False, False, line_) )
-    return db, sdb  
+            sdb._add(Structure.INVALID, False, line_)
+    if refused > 1:
+        logged = True
+        logger.error('In file %r could not read %d pickled values, `safe` is True', where, refused)
+    return db, sdb, logged
+
+def _read_config(infofile, safe, name=None):
+    """Parse `infofile`, see `_parse_config`, and return `(db, sdb)`."""
+    db, sdb, _ = _parse_config(infofile, safe, name)
+    return db, sdb
@@ -15,10 +15,17 @@ Tests all features of the plain configuration file format including:
 import os
 import sys
 import io
+import stat
 import unittest
 import tempfile
 import shutil
+import base64
+import pickle
+import binascii
 import logging
+import enum
+import threading
+import collections.abc
 from pathlib import Path
 
 # Add parent directory to path if running standalone
@@ -31,6 +38,14 @@ import plain_config
 
 logger = logging.getLogger('plain-config')
 
+def roundtrip(data, **kwargs):
+    """Write `data` to memory and read it back, return the data and the text"""
+    F = io.StringIO()
+    plain_config.write_config(F, data, **kwargs)
+    F.seek(0)
+    loaded_data, _ = plain_config.read_config(F, safe=kwargs.get('safe', True))
+    return loaded_data, F.getvalue()
+
 class TestLogging(unittest.TestCase):
     def test_log_messages(self):
         with self.assertLogs(logger, level='INFO') as cm:
@@ -47,21 +62,24 @@ class TestLogging(unittest.TestCase):
 class TestPlainConfig(unittest.TestCase):
     """Test suite for plain_config module"""
 
-    def setUp(self):
-        """Create temporary directory for test files"""
-        self.test_dir = tempfile.mkdtemp(prefix='test_plain_config_')
+    @classmethod
+    def setUpClass(cls):
+        """Create temporary directory for test files, shared by the tests"""
+        cls.test_dir = tempfile.mkdtemp(prefix='test_plain_config_')
 
-    def tearDown(self):
+    @classmethod
+    def tearDownClass(cls):
         """Clean up temporary directory"""
-        shutil.rmtree(self.test_dir)
+        shutil.rmtree(cls.test_dir)
 
-    def get_test_file(self, name='test_config.txt'):
-        """Get path to test file in temporary directory"""
+    def get_test_file(self, name=None):
+        """Get path to test file in temporary directory, by default named after the test"""
+        if name is None:
+            name = self.id().rsplit('.', 1)[-1] + '.txt'
         return os.path.join(self.test_dir, name)
 
     def test_basic_string(self):
         """Test reading/writing plain string values"""
-        config_file = self.get_test_file()
         data = {
             'hostname': ' example.com',
             'username': 'admin  \tfoobar\n',
@@ -69,14 +87,12 @@ class TestPlainConfig(unittest.TestCase):
             'pickleme': 'forward \f backward \b'
         }
 
-        plain_config.write_config(config_file, data)
-        loaded_data, structure = plain_config.read_config(config_file)
+        loaded_data, _ = roundtrip(data)
 
         self.assertEqual(loaded_data, data)
 
     def test_long_string(self):
         """Test reading/writing long string values"""
-        config_file = self.get_test_file()
         data = {
             'hostname': ' example.com' * 100,
             'username': 'admin  \tfoobar\n' * 100,
@@ -85,60 +101,43 @@ class TestPlainConfig(unittest.TestCase):
             'pickleme': 'forward \f backward \b' * 100
         }
 
-        plain_config.write_config(config_file, data)
-        loaded_data, structure = plain_config.read_config(config_file)
+        loaded_data, _ = roundtrip(data)
         self.assertEqual(loaded_data, data)
 
     def test_long_string_no_split(self):
         """Disabling split_long_lines keeps data on a single line"""
-        config_file = self.get_test_file()
         data = {'blob': 'abcdef' * 100}
 
-        plain_config.write_config(config_file, data, split_long_lines=0)
+        loaded_data, content = roundtrip(data, split_long_lines=0)
 
-        with open(config_file) as fh:
-            content = fh.read()
         self.assertNotIn('/C', content)
-
-        loaded_data, _ = plain_config.read_config(config_file)
         self.assertEqual(loaded_data, data)
 
     def test_long_string_short_split(self):
         """ very small split_long_lines=1"""
-        config_file = self.get_test_file()
         data = {'blob': 'abcdef' * 100}
 
-        plain_config.write_config(config_file, data, split_long_lines=1)
+        loaded_data, content = roundtrip(data, split_long_lines=1)
 
-        with open(config_file) as fh:
-            content = fh.read()
         self.assertIn('/C', content)
-
-        loaded_data, _ = plain_config.read_config(config_file)
         self.assertEqual(loaded_data, data)
 
 
     def test_long_string_custom_continuation(self):
         """Custom continuation characters should be honored"""
-        config_file = self.get_test_file()
         data = {
             'notes': 'chunk-' * 40 + '|symbols|inside',
             'other': 'x' * 10
         }
 
-        plain_config.write_config(
-            config_file,
+        loaded_data, content = roundtrip(
             data,
             split_long_lines=30,
             continuation_chars='|~'
         )
 
-        with open(config_file) as fh:
-            content = fh.read()
         self.assertIn('/C~', content)
         self.assertNotIn('/C|', content)  # value already contains '|', so '~' is chosen
-
-        loaded_data, _ = plain_config.read_config(config_file)
         self.assertEqual(loaded_data, data)
 
     def test_long_string_insufficient_custom_continuation(self):
@@ -173,45 +172,56 @@ class TestPlainConfig(unittest.TestCase):
 
     def test_integer_values(self):
         """Test integer type conversion"""
-        config_file = self.get_test_file()
         data = {
             'port': 8080,
             'max_connections': 100,
             'timeout_seconds': 30
         }
 
-        plain_config.write_config(config_file, data)
-        loaded_data, structure = plain_config.read_config(config_file)
+        loaded_data, _ = roundtrip(data)
 
         self.assertEqual(loaded_data, data)
         self.assertIsInstance(loaded_data['port'], int)
 
     def test_float_values(self):
         """Test float type conversion"""
-        config_file = self.get_test_file()
         data = {
             'timeout': 30.5,
             'threshold': 0.95,
             'pi': 3.14159
         }
 
-        plain_config.write_config(config_file, data)
-        loaded_data, structure = plain_config.read_config(config_file)
+        loaded_data, _ = roundtrip(data)
+
+        self.assertEqual(loaded_data, data)
+        self.assertIsInstance(loaded_data['timeout'], float)
+
+    def test_float_hex_values(self):
+        """Test floats written in hexadecimal notation"""
+        F = io.StringIO()
+        data = {
+            'timeout': 30.5,
+            'third': 1 / 3,
+            'tiny': 5e-324,
+        }
+
+        plain_config.write_config(F, data, float_hex=True)
+        self.assertIn('third/h=0x1.5555555555555p-2', F.getvalue())
+        F.seek(0)
+        loaded_data, structure = plain_config.read_config(F)
 
         self.assertEqual(loaded_data, data)
         self.assertIsInstance(loaded_data['timeout'], float)
 
     def test_boolean_and_none(self):
         """Test boolean and None values"""
-        config_file = self.get_test_file()
         data = {
             'enabled': True,
             'disabled': False,
             'optional': None
         }
 
-        plain_config.write_config(config_file, data)
-        loaded_data, structure = plain_config.read_config(config_file)
+        loaded_data, _ = roundtrip(data)
 
         self.assertEqual(loaded_data, data)
         self.assertIsInstance(loaded_data['enabled'], bool)
@@ -220,35 +230,30 @@ class TestPlainConfig(unittest.TestCase):
 
     def test_bytes_values(self):
         """Test bytes type encoding/decoding"""
-        config_file = self.get_test_file()
         data = {
             'secret_key': b'my_secret_bytes',
             'binary_data': b'\x00\x01\x02\xff\xfe'
         }
 
-        plain_config.write_config(config_file, data)
-        loaded_data, structure = plain_config.read_config(config_file)
+        loaded_data, _ = roundtrip(data)
 
         self.assertEqual(loaded_data, data)
         self.assertIsInstance(loaded_data['secret_key'], bytes)
 
     def test_string_with_special_chars(self):
         """Test strings containing control characters"""
-        config_file = self.get_test_file()
         data = {
             'newline': 'line1\nline2',
             'tab': 'col1\tcol2',
             'null': 'before\x00after'
         }
 
-        plain_config.write_config(config_file, data)
-        loaded_data, structure = plain_config.read_config(config_file)
+        loaded_data, _ = roundtrip(data)
 
         self.assertEqual(loaded_data, data)
 
     def test_complex_objects(self):
         """Test pickling complex Python objects"""
-        config_file = self.get_test_file()
         data = {
             'list_data': [1, 2, 3, 'four', 5.0],
             'dict_data': {'nested': {'key': 'value'}},
@@ -256,17 +261,50 @@ class TestPlainConfig(unittest.TestCase):
             'set_data': {1, 2, 3, 4, 5}
         }
 
-        plain_config.write_config(config_file, data)
-        loaded_data, structure = plain_config.read_config(config_file)
+        loaded_data, _ = roundtrip(data)
 
         self.assertEqual(loaded_data['list_data'], data['list_data'])
         self.assertEqual(loaded_data['dict_data'], data['dict_data'])
         self.assertEqual(loaded_data['tuple_data'], data['tuple_data'])
         self.assertEqual(loaded_data['set_data'], data['set_data'])
 
+    def test_recursive_container(self):
+        """Recursive containers cannot be written as literals"""
+        F = io.StringIO()
+        shared = [1, 2]
+        data = {'shared': [shared, shared]}
+        plain_config.write_config(F, data)
+        F.seek(0)
+        loaded_data, _ = plain_config.read_config(F)
+        self.assertEqual(loaded_data, data)
+
+        loop = [1]
+        loop.append(loop)
+        with self.assertRaises(RuntimeError):
+            plain_config.write_config(io.StringIO(), {'loop': loop})
+
+    def test_shared_values_encoded_once(self):
+        """Values shared by many keys are encoded once, and written the same"""
+        shared = list(range(100))
+        data = {'first': shared, 'second': shared, 'third': [shared]}
+        loaded_data, content = roundtrip(data, split_long_lines=0)
+        self.assertEqual(loaded_data, data)
+        first, second = content.splitlines()[:2]
+        self.assertEqual(first.partition('=')[2], second.partition('=')[2])
+
+        # values built on access may reuse the ids of freed ones
+        class Lazy(collections.abc.Mapping):
+            def __getitem__(self, k):
+                return [int(k[1:])] * 3
+            def __iter__(self):
+                return iter('k%d' % i for i in range(10))
+            def __len__(self):
+                return 10
+        loaded_data, _ = roundtrip(Lazy())
+        self.assertEqual(loaded_data, dict(Lazy()))
+
     def test_mixed_types(self):
         """Test configuration with mixed data types"""
-        config_file = self.get_test_file()
         data = {
             'string': 'hello',
             'integer': 42,
@@ -278,8 +316,7 @@ class TestPlainConfig(unittest.TestCase):
             'dict_value': {'key': 'value'}
         }
 
-        plain_config.write_config(config_file, data)
-        loaded_data, structure = plain_config.read_config(config_file)
+        loaded_data, _ = roundtrip(data)
 
         self.assertEqual(loaded_data, data)
 
@@ -338,6 +375,44 @@ class TestPlainConfig(unittest.TestCase):
         self.assertIn('# This is a comment', content)
         self.assertIn('# Another comment', content)
 
+    def test_structure_as_list(self):
+        """Structure behaves as a sequence of triples, and plain lists are accepted"""
+        content = '# comment\nkey1=value1\nbad line\n'
+        with self.assertLogs(logger, level='WARNING') as cm:
+            loaded_data, structure = plain_config.read_config(io.StringIO(content))
+        self.assertEqual(len(cm.output), 1)
+        self.assertIn("ignored line 'bad line'", cm.output[0])
+        triples = [
+            (None, None, '# comment\n'),
+            ('key1', '', 'key1=value1\n'),
+            (False, False, 'bad line\n'),
+        ]
+        self.assertIsInstance(structure, plain_config.Structure)
+        self.assertEqual(structure, triples)
+        self.assertEqual(list(structure), triples)
+        self.assertEqual(structure[1], triples[1])
+
+        # list operations
+        edited = structure.copy()
+        edited.insert(0, (None, None, '# first\n'))
+        edited[2] = ('key2', '', 'key2=x\n')
+        del edited[-1]
+        edited.extend([(None, None, '\n')])
+        edited[1:2] = [(False, False, 'junk\n')]
+        expected = [(None, None, '# first\n'), (False, False, 'junk\n'),
+                    ('key2', '', 'key2=x\n'), (None, None, '\n')]
+        self.assertEqual(edited, expected)
+        self.assertEqual(edited.keys, [None, False, 'key2', None])
+        self.assertEqual(structure, triples)
+        self.assertEqual(structure + [(None, None, '\n')], triples + [(None, None, '\n')])
+        self.assertEqual([(None, None, '\n')] + structure, [(None, None, '\n')] + triples)
+        self.assertIsInstance(structure + [], plain_config.Structure)
+
+        for sdb in (structure, triples):
+            F = io.StringIO()
+            plain_config.write_config(F, {'key1': 'modified', 'key2': 2}, sdb)
+            self.assertEqual(F.getvalue(), '# comment\nkey1=modified\nkey2/i=2\n')
+
     def test_path_object_as_filename(self):
         """Test using Path object for filename"""
         config_file = Path(self.get_test_file())
@@ -348,6 +423,15 @@ class TestPlainConfig(unittest.TestCase):
 
         self.assertEqual(loaded_data, data)
 
+        # any os.PathLike is accepted
+        class PathLike:
+            def __fspath__(self):
+                return str(config_file)
+        data = {'test_key': 'other_value'}
+        plain_config.write_config(PathLike(), data)
+        loaded_data, _ = plain_config.read_config(PathLike())
+        self.assertEqual(loaded_data, data)
+
     def test_file_object_write(self):
         """Test writing to file-like object"""
         config_file = self.get_test_file()
@@ -384,6 +468,37 @@ class TestPlainConfig(unittest.TestCase):
         self.assertEqual(loaded_data, {})
         self.assertEqual(structure, [])
 
+    @unittest.skipUnless(hasattr(os, 'mkfifo'), 'needs os.mkfifo')
+    def test_read_fifo(self):
+        """Pipes report a zero size but are read anyway, and never cached"""
+        fifo = self.get_test_file()
+        os.mkfifo(fifo)
+        for content, data in (('a/i=1\nb=x\n', {'a': 1, 'b': 'x'}), ('a/i=2\n', {'a': 2})):
+            def feed():
+                with open(fifo, 'w') as f:
+                    f.write(content)
+            t = threading.Thread(target=feed)
+            t.start()
+            loaded_data, _ = plain_config.read_config(fifo)
+            t.join()
+            self.assertEqual(loaded_data, data)
+
+    @unittest.skipUnless(hasattr(os, 'mkfifo'), 'needs os.mkfifo')
+    def test_write_fifo(self):
+        """Pipes are written into, not replaced by a regular file"""
+        fifo = self.get_test_file()
+        os.mkfifo(fifo)
+        received = []
+        def drain():
+            with open(fifo) as f:
+                received.append(f.read())
+        t = threading.Thread(target=drain)
+        t.start()
+        plain_config.write_config(fifo, {'a': 1, 'b': 'x'})
+        t.join()
+        self.assertEqual(received, ['a/i=1\nb=x\n'])
+        self.assertTrue(stat.S_ISFIFO(os.stat(fifo).st_mode))
+
     def test_only_comments(self):
         """Test configuration with only comments"""
         config_file = self.get_test_file()
@@ -419,23 +534,34 @@ class TestPlainConfig(unittest.TestCase):
         self.assertEqual(loaded_data['keep_key'], 'modified')
         self.assertEqual(loaded_data['new_key'], 'new_value')
 
+    def test_str_subclasses(self):
+        """Subclasses of str are written as their string data"""
+        class Color(str, enum.Enum):
+            RED = 'red'
+            LONG = 'blue' * 30
+            CTRL = 'a\tb'
+        data = {Color.RED: Color.RED, 'long': Color.LONG, 'ctrl': Color.CTRL}
+        loaded_data, content = roundtrip(data)
+        self.assertIn('red=red\n', content)
+        self.assertEqual(loaded_data, {'red': 'red', 'long': 'blue' * 30, 'ctrl': 'a\tb'})
+        for k, v in loaded_data.items():
+            self.assertIs(type(k), str)
+            self.assertIs(type(v), str)
+
     def test_special_characters_in_values(self):
         """Test values with equals signs and other special characters"""
-        config_file = self.get_test_file()
         data = {
             'equation': '2+2=4',
             'url': 'http://example.com?param=value&other=data',
             'spaces': '  leading and trailing  '
         }
 
-        plain_config.write_config(config_file, data)
-        loaded_data, _ = plain_config.read_config(config_file)
+        loaded_data, _ = roundtrip(data)
 
         self.assertEqual(loaded_data, data)
 
     def test_unicode_strings(self):
         """Test Unicode strings"""
-        config_file = self.get_test_file()
         data = {
             'emoji': '😀🎉🚀',
             'chinese': '你好世界',
@@ -443,14 +569,12 @@ class TestPlainConfig(unittest.TestCase):
             'russian': 'Привет'
         }
 
-        plain_config.write_config(config_file, data)
-        loaded_data, _ = plain_config.read_config(config_file)
+        loaded_data, _ = roundtrip(data)
 
         self.assertEqual(loaded_data, data)
 
     def test_large_values(self):
         """Test handling of large values"""
-        config_file = self.get_test_file()
         large_string = 'x' * 10000
         large_list = list(range(1000))
 
@@ -459,8 +583,7 @@ class TestPlainConfig(unittest.TestCase):
             'large_list': large_list
         }
 
-        plain_config.write_config(config_file, data)
-        loaded_data, _ = plain_config.read_config(config_file)
+        loaded_data, _ = roundtrip(data)
 
         self.assertEqual(loaded_data['large_string'], large_string)
         self.assertEqual(loaded_data['large_list'], large_list)
@@ -508,6 +631,11 @@ class TestPlainConfig(unittest.TestCase):
         with self.assertRaises(AssertionError):
             plain_config.write_config(config_file, data)
 
+        # Keys with control characters would break the line
+        data = {'invalid\nkey': 'value'}
+        with self.assertRaises(AssertionError):
+            plain_config.write_config(config_file, data)
+
 
     def test_file_permissions(self):
         """Test that written files have correct permissions (0o600)"""
@@ -522,6 +650,100 @@ class TestPlainConfig(unittest.TestCase):
             permissions = stat_info.st_mode & 0o777
             self.assertEqual(permissions, 0o600)
 
+            # existing files are also restricted
+            os.chmod(config_file, 0o644)
+            plain_config.write_config(config_file, data)
+            self.assertEqual(os.stat(config_file).st_mode & 0o777, 0o600)
+
+
+    def test_atomic_write(self):
+        """A failed write leaves the old file untouched, symlinks are kept"""
+        config_file = self.get_test_file()
+        data = {'key': 'value'}
+        plain_config.write_config(config_file, data)
+
+        with self.assertRaises(AssertionError):
+            plain_config.write_config(config_file, {'key': 'new value', 'bad=key': 1})
+        loaded_data, _ = plain_config.read_config(config_file)
+        self.assertEqual(loaded_data, data)
+        self.assertEqual([f for f in os.listdir(self.test_dir) if f.endswith('.tmp')], [])
+
+        # concurrent writers do not share the temporary file
+        errors = []
+        def writer():
+            for i in range(20):
+                try:
+                    plain_config.write_config(config_file, {'key': i})
+                except Exception as E:
+                    errors.append(E)
+        threads = [threading.Thread(target=writer) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual([f for f in os.listdir(self.test_dir) if f.endswith('.tmp')], [])
+
+        if hasattr(os, 'symlink'):
+            link = self.get_test_file('test_atomic_write_link.txt')
+            os.symlink(config_file, link)
+            plain_config.write_config(link, {'key': 'via link'})
+            self.assertTrue(os.path.islink(link))
+            loaded_data, _ = plain_config.read_config(config_file)
+            self.assertEqual(loaded_data, {'key': 'via link'})
+
+    def test_read_cache(self):
+        """Repeated reads of an unchanged file return independent copies"""
+        config_file = self.get_test_file()
+        data = {'list': [1, 2, 3], 'key': 'value'}
+
+        plain_config.write_config(config_file, data)
+        first, first_structure = plain_config.read_config(config_file)
+        first['list'].append(4)
+        first['key'] = 'changed'
+        first_structure.append((None, None, '# added\n'))
+        second, second_structure = plain_config.read_config(config_file)
+        self.assertEqual(second, data)
+        self.assertEqual(len(second_structure), 2)
+
+        # a changed file is parsed again
+        data['key'] = 'another value'
+        plain_config.write_config(config_file, data)
+        third, _ = plain_config.read_config(config_file)
+        self.assertEqual(third, data)
+
+        # writing drops the cached entry, even when size and mtime do not change
+        plain_config.write_config(config_file, {'key': 'same value 1'})
+        plain_config.read_config(config_file)
+        st = os.stat(config_file)
+        plain_config.write_config(config_file, {'key': 'same value 2'})
+        os.utime(config_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+        fourth, _ = plain_config.read_config(Path(config_file))
+        self.assertEqual(fourth, {'key': 'same value 2'})
+
+        # diagnostics are logged by every read
+        with open(config_file, 'w') as f:
+            f.write('key=value\nbad line\n')
+        for _ in range(2):
+            with self.assertLogs(logger, level='WARNING') as cm:
+                loaded_data, _ = plain_config.read_config(config_file)
+            self.assertEqual(loaded_data, {'key': 'value'})
+            self.assertIn("ignored line 'bad line'", cm.output[0])
+
+        plain_config.read_config.cache_clear()
+        self.assertEqual(plain_config._PARSE_CACHE, {})
+
+    def test_line_endings_and_bom(self):
+        """Streams are split with universal newlines, a leading BOM is dropped"""
+        content = '\ufeff# comment\r\nkey1=value1\rkey2=a\u2028b\x0cc\nkey3/i=3'
+        loaded_data, structure = plain_config.read_config(io.StringIO(content))
+        self.assertEqual(loaded_data, {'key1': 'value1', 'key2': 'a\u2028b\x0cc', 'key3': 3})
+        self.assertEqual(structure[0], (None, None, '# comment\n'))
+        self.assertEqual(len(structure), 4)
+
+        lines = ['key1=value1\n', 'key2/i=2']
+        loaded_data, _ = plain_config.read_config(lines)
+        self.assertEqual(loaded_data, {'key1': 'value1', 'key2': 2})
 
     def test_string_io(self):
         F = io.StringIO()
@@ -535,16 +757,20 @@ class TestPlainConfig(unittest.TestCase):
 class TestModifierCombinations(unittest.TestCase):
     """Test various combinations of type modifiers"""
 
-    def setUp(self):
-        """Create temporary directory for test files"""
-        self.test_dir = tempfile.mkdtemp(prefix='test_modifiers_')
+    @classmethod
+    def setUpClass(cls):
+        """Create temporary directory for test files, shared by the tests"""
+        cls.test_dir = tempfile.mkdtemp(prefix='test_modifiers_')
 
-    def tearDown(self):
+    @classmethod
+    def tearDownClass(cls):
         """Clean up temporary directory"""
-        shutil.rmtree(self.test_dir)
+        shutil.rmtree(cls.test_dir)
 
-    def get_test_file(self, name='test_modifiers.txt'):
-        """Get path to test file in temporary directory"""
+    def get_test_file(self, name=None):
+        """Get path to test file in temporary directory, by default named after the test"""
+        if name is None:
+            name = self.id().rsplit('.', 1)[-1] + '.txt'
         return os.path.join(self.test_dir, name)
 
     def test_base64_pickle_combination(self):
@@ -569,40 +795,107 @@ class TestModifierCombinations(unittest.TestCase):
         self.assertEqual(loaded_data, data)
 
 
+    def test_pickle_refused_when_safe(self):
+        """Pickled values are skipped when safe=True, logging once per file"""
+        F = io.StringIO()
+        data = {'one': Exception, 'two': ValueError, 'three': 3}
+        plain_config.write_config(F, data, safe=False)
+
+        F.seek(0)
+        with self.assertLogs(logger, level='ERROR') as cm:
+            loaded_data, structure = plain_config.read_config(F)
+        self.assertEqual(loaded_data, {'three': 3})
+        self.assertEqual(len(cm.output), 2)
+        self.assertIn('`safe` is True', cm.output[0])
+        self.assertIn('2 pickled values', cm.output[1])
+
+        F.seek(0)
+        loaded_data, _ = plain_config.read_config(F, safe=False)
+        self.assertEqual(loaded_data, data)
+
     def test_ast_combination(self):
         """Test /r modifier combination (will use ast.literal_eval)"""
-        config_file = self.get_test_file()
 
-        # Write complex object (will use /r automatically)
-        data = {'complex': {'nested': [1, 2, 3]}}
-        plain_config.write_config(config_file, data)
+        # Write complex object (will use /r automatically, JSON has no tuples)
+        data = {'complex': {'nested': (1, 2, 3)}}
+        loaded_data, content = roundtrip(data)
 
-        # Verify file contains /64p
-        with open(config_file) as f:
-            content = f.read()
         self.assertIn('/r=', content)
+        self.assertEqual(loaded_data, data)
 
-        # Read back
+    def test_escaped_strings(self):
+        """Test /e modifier for strings with control characters"""
+
+        data = {
+            'multiline': 'line1\nline2',
+            'controls': 'forward \f backward \b\x85',
+            'backslash': 'C:\\dir\\\tname\\u0041',
+            'unicode': 'caf\xe9 \u4f60\u597d \U0001f600\r\n',
+        }
+        loaded_data, content = roundtrip(data)
+
+        self.assertIn('multiline/e=line1\\nline2\n', content)
+        self.assertIn('controls/e=forward \\x0c backward \\x08\\x85\n', content)
+        self.assertIn('unicode/e=caf\xe9 \u4f60\u597d \U0001f600\\r\\n\n', content)
+        self.assertEqual(loaded_data, data)
+
+    def test_json_combination(self):
+        """Test /j modifier (will use json.loads)"""
+
+        data = {
+            'complex': {'nested': [1, 2.5, 'three', None, True]},
+            'list': ['a', {'b': []}],
+            'int_keys': {1: 'one'},
+            'del_char': ['x\x7fy'],
+            'surrogate': ['a\ud800b'],
+        }
+        loaded_data, content = roundtrip(data)
+
+        self.assertIn('complex/j={"nested": [1, 2.5, "three", null, true]}', content)
+        self.assertIn('list/j=', content)
+        # not representable exactly in JSON, or not readable as such
+        self.assertIn('int_keys/r=', content)
+        self.assertIn('del_char/r=', content)
+        self.assertIn('surrogate/r=', content)
+        self.assertEqual(loaded_data, data)
+
+        # lone surrogates cannot be encoded to a file
+        config_file = self.get_test_file()
+        plain_config.write_config(config_file, data)
         loaded_data, _ = plain_config.read_config(config_file)
         self.assertEqual(loaded_data, data)
 
     def test_base32_encoding(self):
         """Test base32 encoding for bytes"""
-        config_file = self.get_test_file()
 
         # Write bytes (will use /32 automatically)
         data = {'binary': b'test_bytes'}
-        plain_config.write_config(config_file, data)
+        loaded_data, content = roundtrip(data)
 
-        # Verify file contains /32
-        with open(config_file) as f:
-            content = f.read()
         self.assertIn('/32=', content)
-
-        # Read back
-        loaded_data, _ = plain_config.read_config(config_file)
         self.assertEqual(loaded_data, data)
 
+    def test_base85_decoding(self):
+        """Test /85 and /85p modifiers"""
+        payload = os.urandom(100)
+        content = 'binary/85={}\nobj/85p={}\n'.format(
+            base64.b85encode(payload).decode('ascii'),
+            base64.b85encode(pickle.dumps({'a': Exception})).decode('ascii'))
+        loaded_data, _ = plain_config.read_config(io.StringIO(content), safe=False)
+        self.assertEqual(loaded_data, {'binary': payload, 'obj': {'a': Exception}})
+
+    def test_base32_codec_matches_stdlib(self):
+        """The vectorized base32 codec agrees with the base64 module"""
+        for n in list(range(0, 100)) + [1000, 4099]:
+            payload = os.urandom(n)
+            encoded = base64.b32encode(payload)
+            self.assertEqual(plain_config._b32encode(payload), encoded)
+            self.assertEqual(plain_config._b32decode(encoded), payload)
+            self.assertEqual(plain_config._b32decode(encoded.decode('ascii')), payload)
+        for bad in (b'A' * 96 + b'========', b'A' * 80 + b'=' * 8 + b'AAAAAAAA', b'a' * 104):
+            with self.assertRaises(binascii.Error):
+                plain_config._b32decode(bad)
+
     def test_unknown_modifier(self):
         badline =  'foobar/X=hello\n'
         content = badline + 'a/i=1\n'